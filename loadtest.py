@@ -0,0 +1,302 @@
+"""Local load test: many concurrent scripted participants against one Streamlit server.
+
+The harness starts ``streamlit run streamlit_app.py`` on a local port (or uses
+``--url`` to target a server that is already running) and opens one websocket
+per simulated participant, speaking the same protobuf protocol as the browser.
+Each participant logs in with the bcrypt credentials from config.yaml, picks a
+strategy and clicks through ten "Simulate Year" / "Advance to Next Year" cycles
+with randomised decisions. Sessions stay connected until every participant has
+finished, so the server's memory is measured with the whole cohort loaded.
+
+Example:
+    python loadtest.py --sessions 200 --concurrency 200 --ramp-up 120 --password <plaintext>
+
+Linux only (server memory and CPU are read from /proc); needs no external services.
+"""
+import argparse
+import contextlib
+import os
+import pathlib
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from websockets.sync.client import connect
+
+STRATEGIES = [
+    'Long Haul Hub', 'Regional Hub', 'Short Haul Spoke', 'Long Haul Spoke',
+    'Low-Cost Airport', 'Cargo Airport', 'Passenger and Cargo Hub'
+]
+PROJECTS = ['None', 'New Terminal', 'Expand Runway', 'Cargo Hangar', 'Non-Aero Retail Expansion']
+CAMPAIGNS_LABEL = "Select campaigns to fund (Max €5M every two years):"
+ACTIONS = ['connect', 'page', 'login', 'start', 'decide', 'simulate', 'advance']
+YEARS = 10
+
+
+def proc_rss_bytes(pid):
+    with open(f"/proc/{pid}/status", encoding="ascii") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def proc_cpu_seconds(pid):
+    with open(f"/proc/{pid}/stat", encoding="ascii") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    # utime and stime are fields 14 and 15 of /proc/<pid>/stat.
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return float('nan')
+    rank = max(1, round(pct / 100 * len(values)))
+    return values[min(rank, len(values)) - 1]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(app_path, port, timeout):
+    server = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", str(app_path),
+         "--server.headless", "true", "--server.port", str(port), "--server.address", "127.0.0.1",
+         "--server.fileWatcherType", "none", "--browser.gatherUsageStats", "false"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1):
+                return server
+        except OSError:
+            if server.poll() is not None:
+                raise RuntimeError("streamlit server exited during startup")
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f"streamlit server did not become healthy within {timeout:.0f}s")
+
+
+class Participant:
+    """One scripted browser session; records how long each interaction took."""
+
+    def __init__(self, url, username, password, seed, think_time, timeout):
+        self.url = url
+        self.username = username
+        self.password = password
+        self.rng = random.Random(seed)
+        self.think_time = think_time
+        self.timeout = timeout
+        self.latencies = {action: [] for action in ACTIONS}
+        self.connection = contextlib.ExitStack()
+        self.websocket = None
+        self.widgets = {}
+
+    def open(self):
+        started = time.perf_counter()
+        self.websocket = self.connection.enter_context(
+            connect(self.url, subprotocols=["streamlit"], max_size=None, open_timeout=self.timeout)
+        )
+        self.latencies['connect'].append(time.perf_counter() - started)
+        self._rerun('page')
+
+    def close(self):
+        self.connection.close()
+
+    def _state(self, label, **value):
+        state = WidgetState(id=self.widgets[label].id)
+        if 'string_array_value' in value:
+            state.string_array_value.data.extend(value.pop('string_array_value'))
+        for field, field_value in value.items():
+            setattr(state, field, field_value)
+        return state
+
+    def _rerun(self, action, states=()):
+        """Send one rerun and wait until the script (including any st.rerun) settles."""
+        message = BackMsg()
+        message.rerun_script.query_string = ""
+        message.rerun_script.widget_states.widgets.extend(states)
+        started = time.perf_counter()
+        self.websocket.send(message.SerializeToString())
+        self.widgets = {}
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(self.websocket.recv(timeout=self.timeout))
+            kind = forward.WhichOneof('type')
+            if kind == 'delta' and forward.delta.WhichOneof('type') == 'new_element':
+                element = forward.delta.new_element
+                element_type = element.WhichOneof('type')
+                proto = getattr(element, element_type)
+                if element_type == 'exception':
+                    raise RuntimeError(f"{action}: {proto.type}: {proto.message}")
+                if getattr(proto, 'id', '') and hasattr(proto, 'label'):
+                    self.widgets[proto.label] = proto
+            elif kind == 'script_finished' and forward.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                break
+        self.latencies[action].append(time.perf_counter() - started)
+        if self.think_time:
+            time.sleep(self.rng.uniform(0, 2 * self.think_time))
+
+    def _click(self, action, button, *states):
+        if button not in self.widgets:
+            raise RuntimeError(f"{action}: no '{button}' button on the page")
+        self._rerun(action, [*states, self._state(button, trigger_value=True)])
+
+    def play(self, years=YEARS):
+        self.open()
+        self._click('login', 'Login',
+                    self._state('Username', string_value=self.username),
+                    self._state('Password', string_value=self.password))
+        if "Start Simulation" not in self.widgets:
+            raise RuntimeError("login: credentials rejected")
+
+        self._click('start', 'Start Simulation',
+                    self._state("Choose your airport's strategy:", string_value=self.rng.choice(STRATEGIES)))
+
+        for _ in range(years):
+            project = self.rng.choices(PROJECTS, weights=[6, 1, 1, 1, 1])[0]
+            decisions = [self._state('Select a project:', string_value=project)]
+            # Picking a project reveals its loan input, as it would in the browser.
+            self._rerun('decide', decisions)
+            loan_label = f"Enter the loan amount for {project} (max "
+            for label in self.widgets:
+                if label.startswith(loan_label):
+                    decisions.append(self._state(label, double_value=float(self.rng.choice([0, 10_000_000]))))
+            campaigns = list(self.widgets[CAMPAIGNS_LABEL].options)
+            decisions += [
+                self._state(CAMPAIGNS_LABEL, string_array_value=self.rng.sample(campaigns, self.rng.randint(0, 2))),
+                self._state("Enter OPEX change (% over previous year):", double_value=round(self.rng.uniform(-5, 5), 1)),
+                self._state("Enter Airport Charges change (% over previous year):", double_value=round(self.rng.uniform(-5, 5), 1)),
+            ]
+            self._click('simulate', 'Simulate Year', *decisions)
+            self._click('advance', 'Advance to Next Year')
+
+
+def run_load_test(args):
+    server = None
+    url = args.url
+    if url is None:
+        port = free_port()
+        server = start_server(pathlib.Path(args.app).resolve(), port, args.timeout)
+        url = f"ws://127.0.0.1:{port}/_stcore/stream"
+    server_pid = server.pid if server else args.server_pid
+
+    participants = []
+    errors = []
+    lock = threading.Lock()
+    peak_rss = [0]
+    done = threading.Event()
+
+    def sample_memory():
+        while not done.wait(0.5):
+            peak_rss[0] = max(peak_rss[0], proc_rss_bytes(server_pid))
+
+    def play(index):
+        # Spread logins over the ramp-up window like a class arriving; the
+        # schedule counts from the start of the test, not from when a pool
+        # worker frees up, so --concurrency below --sessions does not shift it.
+        time.sleep(max(0.0, start_times[index] - time.perf_counter()))
+        participant = Participant(url, args.username, args.password, args.seed + index,
+                                  args.think_time, args.timeout)
+        with lock:
+            participants.append(participant)
+        try:
+            participant.play()
+        except Exception as exc:
+            with lock:
+                errors.append(f"session {index}: {exc}")
+
+    try:
+        # One warm-up session through login and a simulated year, so bcrypt,
+        # pandas, altair and the caches are loaded before measuring.
+        warmup = Participant(url, args.username, args.password, args.seed - 1, 0, args.timeout)
+        try:
+            warmup.play(years=1)
+        finally:
+            warmup.close()
+
+        if server_pid:
+            rss_before = proc_rss_bytes(server_pid)
+            cpu_before = proc_cpu_seconds(server_pid)
+            threading.Thread(target=sample_memory, daemon=True).start()
+        started = time.perf_counter()
+        start_times = [started + args.ramp_up * index / max(1, args.sessions) for index in range(args.sessions)]
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            list(pool.map(play, range(args.sessions)))
+        elapsed = time.perf_counter() - started
+        if server_pid:
+            rss_after = proc_rss_bytes(server_pid)
+            cpu_used = proc_cpu_seconds(server_pid) - cpu_before
+        done.set()
+    finally:
+        for participant in participants:
+            participant.close()
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    completed = args.sessions - len(errors)
+    print(f"Sessions: {args.sessions} (concurrency {args.concurrency}, ramp-up {args.ramp_up:.0f}s, "
+          f"think time {args.think_time:.1f}s)")
+    print(f"Completed: {completed}, failed: {len(errors)}")
+    for error in errors[:10]:
+        print(f"  {error}")
+
+    total_reruns = 0
+    print(f"{'action':<10}{'count':>8}{'mean ms':>10}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for action in ACTIONS:
+        values = sorted(value for participant in participants for value in participant.latencies[action])
+        total_reruns += len(values)
+        if not values:
+            continue
+        print(f"{action:<10}{len(values):>8}{statistics.fmean(values) * 1000:>10.0f}"
+              f"{percentile(values, 50) * 1000:>10.0f}{percentile(values, 90) * 1000:>10.0f}"
+              f"{percentile(values, 99) * 1000:>10.0f}{values[-1] * 1000:>10.0f}")
+
+    print(f"Wall time: {elapsed:.1f}s")
+    print(f"Throughput: {total_reruns / elapsed:.1f} reruns/s, {completed / elapsed * 60:.1f} sessions/min")
+    if server_pid:
+        print(f"Server CPU: {cpu_used:.1f}s ({cpu_used / elapsed * 100:.0f}% of one core)")
+        print(f"Server memory: RSS {rss_before / 1e6:.0f} MB -> {rss_after / 1e6:.0f} MB "
+              f"(peak {max(peak_rss[0], rss_after) / 1e6:.0f} MB), "
+              f"{(rss_after - rss_before) / max(1, args.sessions) / 1e3:.0f} KB per session")
+    return 1 if errors else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app", default=pathlib.Path(__file__).with_name("streamlit_app.py"),
+                        help="app script to serve; its config.yaml must hold the test user")
+    parser.add_argument("--url", help="websocket URL of a running server, e.g. ws://127.0.0.1:8501/_stcore/stream")
+    parser.add_argument("--server-pid", type=int, help="pid of the --url server, to report its memory and CPU")
+    parser.add_argument("--sessions", type=int, default=100, help="participants to simulate")
+    parser.add_argument("--concurrency", type=int, default=100, help="sessions running at once; later sessions wait for a free slot")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="seconds over which sessions start")
+    parser.add_argument("--think-time", type=float, default=0.0, help="mean pause between clicks in seconds")
+    parser.add_argument("--username", default="participant")
+    parser.add_argument("--password", default=os.environ.get("LOADTEST_PASSWORD"),
+                        help="plaintext password (or set LOADTEST_PASSWORD)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds allowed per rerun")
+    args = parser.parse_args()
+    if not args.password:
+        parser.error("--password or LOADTEST_PASSWORD is required")
+    raise SystemExit(run_load_test(args))
+
+
+if __name__ == "__main__":
+    main()
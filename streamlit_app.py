@@ -1,12 +1,36 @@
-import streamlit as st
-import pandas as pd
-import random
-import altair as alt
-import yaml
-from yaml.loader import SafeLoader
+import time
+_script_started = time.perf_counter()
+
+import csv
+import hmac
+import io
+import json
+import logging
 import pathlib
+import os
+import pickle
+import secrets
+import shutil
+import tempfile
+import threading
+import uuid
+import weakref
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, wait
+import streamlit as st
+from streamlit import runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import streamlit_authenticator as stauth
 
+# pandas and altair are only needed once a year has been simulated, so they are
+# imported lazily on the results page to keep the login screen fast to serve.
+
+logger = logging.getLogger(__name__)
+
+# Seconds the script may spend on imports and config setup before the login
+# form is built; exceeding it is logged so slow container starts are visible.
+STARTUP_BUDGET_SECONDS = 1.0
+
 def scroll_to_top():
     """A helper function to inject JavaScript that scrolls the page to the top."""
     st.markdown(
@@ -22,6 +46,16 @@ def scroll_to_top():
         unsafe_allow_html=True
     )
 
+STRATEGY_PARAMS = {
+    'Long Haul Hub': {'price_elasticity': 0.2, 'opex_quality_benchmark': 0.10, 'cost_penalty_multiplier': 1.5, 'quality_boost_multiplier': 6},
+    'Regional Hub': {'price_elasticity': 0.4, 'opex_quality_benchmark': 0.0813, 'cost_penalty_multiplier': 2, 'quality_boost_multiplier': 5},
+    'Short Haul Spoke': {'price_elasticity': 0.7, 'opex_quality_benchmark': 0.07, 'cost_penalty_multiplier': 3, 'quality_boost_multiplier': 4},
+    'Long Haul Spoke': {'price_elasticity': 0.5, 'opex_quality_benchmark': 0.085, 'cost_penalty_multiplier': 2.5, 'quality_boost_multiplier': 5},
+    'Low-Cost Airport': {'price_elasticity': 0.9, 'opex_quality_benchmark': 0.05, 'cost_penalty_multiplier': 4, 'quality_boost_multiplier': 2},
+    'Cargo Airport': {'price_elasticity': 0.1, 'opex_quality_benchmark': 0.15, 'cost_penalty_multiplier': 1.0, 'quality_boost_multiplier': 8},
+    'Passenger and Cargo Hub': {'price_elasticity': 0.3, 'opex_quality_benchmark': 0.12, 'cost_penalty_multiplier': 1.8, 'quality_boost_multiplier': 7}
+}
+
 class Airport:
     def __init__(self, initial_traffic, initial_equity, initial_assets, initial_opex_ratio, initial_asset_value, initial_cargo_tonnes):
         self.strategy = None
@@ -160,17 +194,7 @@ class Airport:
         self.cost_impact = 0.0
         self.cargo_growth_rate = 0.0
 
-        strategy_params = {
-            'Long Haul Hub': {'price_elasticity': 0.2, 'opex_quality_benchmark': 0.10, 'cost_penalty_multiplier': 1.5, 'quality_boost_multiplier': 6},
-            'Regional Hub': {'price_elasticity': 0.4, 'opex_quality_benchmark': 0.0813, 'cost_penalty_multiplier': 2, 'quality_boost_multiplier': 5},
-            'Short Haul Spoke': {'price_elasticity': 0.7, 'opex_quality_benchmark': 0.07, 'cost_penalty_multiplier': 3, 'quality_boost_multiplier': 4},
-            'Long Haul Spoke': {'price_elasticity': 0.5, 'opex_quality_benchmark': 0.085, 'cost_penalty_multiplier': 2.5, 'quality_boost_multiplier': 5},
-            'Low-Cost Airport': {'price_elasticity': 0.9, 'opex_quality_benchmark': 0.05, 'cost_penalty_multiplier': 4, 'quality_boost_multiplier': 2},
-            'Cargo Airport': {'price_elasticity': 0.1, 'opex_quality_benchmark': 0.15, 'cost_penalty_multiplier': 1.0, 'quality_boost_multiplier': 8},
-            'Passenger and Cargo Hub': {'price_elasticity': 0.3, 'opex_quality_benchmark': 0.12, 'cost_penalty_multiplier': 1.8, 'quality_boost_multiplier': 7}
-        }
-
-        params = strategy_params.get(self.strategy, strategy_params['Regional Hub'])
+        params = STRATEGY_PARAMS.get(self.strategy, STRATEGY_PARAMS['Regional Hub'])
 
         # Check for completed projects
         self.depreciation = 0
@@ -431,6 +455,661 @@ class Airport:
         st.write(f"Net Change in Cash: ${self.cfo + self.cfi + self.cff:,.2f}")
         st.write(f"Cash Balance (End of Year): ${self.cash_balance:,.2f}")
 
+def project_trajectories(airport, years, gdp_growth=2.0, opex_change=0.0, aero_charge_change=0.0):
+    """Project the airport forward ``years`` years under a fixed policy, without stepping the UI.
+
+    Policy arguments are percentages like the yearly inputs and may be scalars
+    (constant policy) or one value per year (schedule). Pending CAPEX projects
+    and existing loans play out as in update_for_new_year; no new projects,
+    loans or campaigns are assumed. Traffic, charges, OPEX and cargo are
+    cumulative products of their yearly growth factors, the ``capacity_pax * 1.5``
+    ceiling is applied through a running minimum in log space, and the
+    congestion quality penalty is refined by re-running that pass until the
+    path stops changing (at most ``years + 1`` passes). Only the
+    equity/compensation recurrence is a year-by-year loop. Returns one row per
+    projected year.
+    """
+    import numpy as np
+    import pandas as pd
+
+    n = int(years)
+    if n < 1:
+        raise ValueError(f"years must be at least 1, got {years!r}")
+    year_index = np.arange(1, n + 1)
+    gdp = np.broadcast_to(np.asarray(gdp_growth, dtype=float), (n,)) / 100
+    opex_growth = 1 + np.broadcast_to(np.asarray(opex_change, dtype=float), (n,)) / 100
+    charge_change = np.broadcast_to(np.asarray(aero_charge_change, dtype=float), (n,)) / 100
+    params = STRATEGY_PARAMS.get(airport.strategy, STRATEGY_PARAMS['Regional Hub'])
+
+    # Pending projects become step changes in the year they complete
+    capacity_added = np.zeros(n)
+    asset_added = np.zeros(n)
+    depreciation = np.zeros(n)
+    sqm_added = np.zeros(n)
+    cargo_added = np.zeros(n)
+    hangars_pending = np.zeros(n)
+    for project in airport.capex_projects:
+        done = max(project['lead_time'], 1) - 1  # index of the completion year
+        if done >= n:
+            if project['name'] == 'Cargo Hangar':
+                hangars_pending += 1
+            continue
+        if project['name'] == 'Cargo Hangar':
+            cargo_added[done] += project['capacity_increase']
+            hangars_pending[:done] += 1
+        else:
+            asset_added[done] += project['cost']
+            depreciation[done] += project['cost'] / 25
+            if project['name'] == 'Non-Aero Retail Expansion':
+                sqm_added[done] += project['non_aero_sqm_increase']
+            else:
+                capacity_added[done] += project['capacity_pax']
+    capacity = airport.capacity_pax + np.cumsum(capacity_added)
+    asset_value = airport.asset_replacement_value + np.cumsum(asset_added)
+    non_aero_sqm = airport.non_aero_sqm + np.cumsum(sqm_added)
+
+    opex = airport.opex * np.cumprod(opex_growth)
+    opex_previous = np.concatenate(([airport.opex], opex[:-1]))
+    aero_charge = airport.aeronautical_charge * np.cumprod(1 + charge_change)
+
+    # Quality effect of the OPEX ratio (depends only on the policy, not on traffic)
+    benchmark = params['opex_quality_benchmark']
+    opex_ratio = opex_previous / asset_value
+    below = opex_ratio < benchmark
+    above = opex_ratio > benchmark
+    opex_quality = np.ones(n)
+    opex_quality[below] = np.maximum(0.5, 1 - (benchmark - opex_ratio[below]) * params['quality_boost_multiplier'])
+    opex_quality[above] = 1 + (opex_ratio[above] - benchmark) * params['quality_boost_multiplier']
+    cost_impact = np.where(above, (opex_ratio - benchmark) * params['cost_penalty_multiplier'], 0.0)
+
+    def cargo_path(growth):
+        # cargo_t = (cargo_{t-1} + added_t) * (1 + growth_t), solved with cumulative products
+        factor = np.cumprod(1 + growth)
+        factor_previous = np.concatenate(([1.0], factor[:-1]))
+        return factor * (airport.cargo_tonnes + np.cumsum(cargo_added / factor_previous))
+
+    if airport.strategy == 'Cargo Airport':
+        cargo_growth = gdp * 0.5 + 0.05 * hangars_pending
+        cargo_growth = np.where(below, cargo_growth * opex_quality, cargo_growth)
+        cargo_growth = np.where(above, cargo_growth + (opex_quality - 1) - cost_impact, cargo_growth)
+        cargo = cargo_path(cargo_growth)
+        traffic = cargo * 0.001
+    else:
+        charge_impact = -charge_change * params['price_elasticity']
+        log_ceiling = np.log(capacity * 1.5)
+        congestion = np.ones(n)
+        traffic = None
+        # Each pass makes the congestion penalty exact for at least one more
+        # year, so n + 1 passes always reach the fixed point.
+        for _ in range(n + 1):
+            quality = np.clip(congestion, 0.5, 1.5) * opex_quality
+            growth = gdp + (quality - 1) + charge_impact - cost_impact
+            # traffic_t = min(traffic_{t-1} * (1 + growth_t), ceiling_t) as a running minimum of logs
+            log_growth = np.cumsum(np.log(np.maximum(1 + growth, 1e-12)))
+            new_traffic = np.exp(log_growth + np.minimum(np.log(airport.traffic),
+                                                         np.minimum.accumulate(log_ceiling - log_growth)))
+            if traffic is not None and np.allclose(new_traffic, traffic, rtol=1e-12, atol=0):
+                break
+            traffic = new_traffic
+            traffic_previous = np.concatenate(([airport.traffic], traffic[:-1]))
+            terminal_utilization = traffic_previous / capacity
+            runway_utilization = (traffic_previous / airport.pax_per_movement / 365) * airport.peak_hour_factor / airport.runway_capacity_movements
+            congestion = (np.where(terminal_utilization > 0.8, np.maximum(0.5, 1 - (terminal_utilization - 0.8) * 2), 1.0)
+                          * np.where(runway_utilization > 0.8, np.maximum(0.5, 1 - (runway_utilization - 0.8) * 2), 1.0))
+        traffic = new_traffic
+        if airport.strategy == 'Passenger and Cargo Hub':
+            cargo = cargo_path(gdp * 0.5 + 0.05 * hangars_pending + (quality - 1) * 0.5)
+        else:
+            cargo = cargo_path(np.zeros(n))
+
+    revenue_aero = traffic * aero_charge
+    revenue_non_aero = traffic * airport.non_aero_spend_per_pax * (non_aero_sqm / 5000)
+    revenue_cargo = cargo * airport.cargo_charge_per_tonne
+    total_revenue = revenue_aero + revenue_non_aero + revenue_cargo
+    ebitda = total_revenue - opex
+
+    # Straight-line amortisation: one row per loan, one column per year
+    interest = np.zeros(n)
+    principal = np.zeros(n)
+    debt = np.zeros(n)
+    for loan in airport.loans:
+        payment = loan['original_amount'] / 10
+        active = year_index <= loan['years_remaining']
+        opening = loan['amount'] - payment * (year_index - 1)
+        interest += np.where(active, opening * loan['interest_rate'], 0.0)
+        principal += np.where(active, payment, 0.0)
+        debt += np.where(year_index < loan['years_remaining'], opening - payment, 0.0)
+
+    if airport.strategy == 'Cargo Airport':
+        regulated_revenue = revenue_cargo
+    elif airport.strategy == 'Passenger and Cargo Hub':
+        regulated_revenue = revenue_aero + revenue_cargo
+    else:
+        regulated_revenue = revenue_aero
+    regulated_share = np.divide(regulated_revenue, total_revenue, out=np.zeros(n), where=total_revenue > 0)
+    profit_before_comp = total_revenue - opex - depreciation - interest
+    regulated_profit = regulated_revenue - regulated_share * (opex + depreciation + interest)
+
+    # Compensation caps the regulated return on last year's equity, so equity is a short recurrence
+    compensation = np.zeros(n)
+    equity = np.zeros(n)
+    equity_previous = airport.equity
+    for t in range(n):
+        allocated_equity = equity_previous * regulated_share[t]
+        if allocated_equity > 0 and regulated_profit[t] > allocated_equity * 0.10:
+            compensation[t] = regulated_profit[t] - allocated_equity * 0.10
+        equity_previous += profit_before_comp[t] - compensation[t]
+        equity[t] = equity_previous
+
+    cash_flow = ebitda - compensation - principal
+    cash_flow[0] += airport.new_loans_this_year - airport.capex_cash_outflow
+    cash_balance = airport.cash_balance + np.cumsum(cash_flow)
+
+    return pd.DataFrame({
+        'Year': airport.year + year_index - 1,
+        'Traffic': traffic,
+        'Capacity': capacity,
+        'Terminal Utilization': traffic / capacity * 100,
+        'Cargo Tonnes': cargo,
+        'Aeronautical Charge': aero_charge,
+        'Revenue (Aero)': revenue_aero,
+        'Revenue (Non-Aero)': revenue_non_aero,
+        'Revenue (Cargo)': revenue_cargo,
+        'OPEX': opex,
+        'EBITDA': ebitda,
+        'Interest Paid': interest,
+        'Compensation': compensation,
+        'Profit': profit_before_comp - compensation,
+        'Equity': equity,
+        'Debt': debt,
+        'Cash Balance (End of Year)': cash_balance,
+    })
+
+# Column order of the rows kept in SimulationState.history. Rows are stored as
+# tuples rather than dicts so a session does not repeat every key each year.
+HISTORY_COLUMNS = (
+    'Year', 'CAPEX Project', 'Lead Time', 'Project Available in Year', 'Loan Amount',
+    'Marketing Campaigns', 'OPEX Change (%)', 'Airport Charges Change (%)',
+    'Traffic', 'Capacity', 'Terminal Utilization', 'Runway Utilization', 'Profit',
+    'Cash Balance (End of Year)', 'Cash Flow from Operations (CFO)',
+    'Cash Flow from Investing (CFI)', 'Cash Flow from Financing (CFF)',
+    'Quality Impact on Traffic (%)', 'Aero Charges Impact on Traffic (%)', 'Cost Impact on Traffic (%)',
+    'Cargo Tonnes', 'Revenue (Aero)', 'Revenue (Non-Aero)', 'Revenue (Cargo)', 'OPEX', 'Depreciation',
+    'EBITDA', 'EBITDAR', 'Regulated Profit', 'Unregulated Profit', 'Profit (Pre-Compensation)',
+    'Compensation', 'Interest Paid', 'Equity', 'Debt', 'Active Loans', 'Aeronautical Charge',
+)
+
+GDP_DATA = {
+    1: 2.0, 2: 2.5, 3: 1.8, 4: 3.0, 5: 2.2,
+    6: 2.8, 7: 1.5, 8: 2.0, 9: 2.5, 10: 2.3,
+    11: 2.1, 12: 1.9, 13: 2.6, 14: 2.4, 15: 2.7,
+    16: 2.0, 17: 2.2, 18: 2.5, 19: 2.1, 20: 2.3
+}
+
+# Metrics overlaid when comparing saved runs, and how many runs a session keeps.
+COMPARISON_METRICS = ('Traffic', 'Profit', 'Cash Balance (End of Year)', 'Terminal Utilization', 'Runway Utilization')
+MAX_SAVED_RUNS = 50
+
+class SimulationState:
+    """Everything one participant's run needs: the airport, its history and the last inputs."""
+
+    def __init__(self):
+        self.saved_runs = []  # (label, strategy, history rows) tuples
+        self.start_new_run()
+
+    def start_new_run(self):
+        self.airport = Airport(
+            initial_traffic=10_000_000,
+            initial_equity=500_000_000,
+            initial_assets=500_000_000,
+            initial_opex_ratio=0.1,
+            initial_asset_value=1_000_000_000,
+            initial_cargo_tonnes=500_000
+        )
+        self.history = []
+        self.inputs = {}
+
+    def runs(self):
+        """Saved runs followed by the run in progress, as (label, strategy, rows) tuples."""
+        runs = list(self.saved_runs)
+        if self.history:
+            runs.append(('Current run', self.airport.strategy, tuple(self.history)))
+        return runs
+
+    def save_run(self, label):
+        """Keep the current history for comparison, dropping the oldest run beyond MAX_SAVED_RUNS."""
+        self.saved_runs.append((label, self.airport.strategy, tuple(self.history)))
+        del self.saved_runs[:-MAX_SAVED_RUNS]
+
+    def to_payload(self):
+        # Plain data only: the script module is re-executed on every rerun, so
+        # pickling the Airport class itself would break across reruns.
+        return {'airport': self.airport.__dict__, 'history': self.history, 'inputs': self.inputs,
+                'saved_runs': self.saved_runs}
+
+    @classmethod
+    def from_payload(cls, payload):
+        state = cls.__new__(cls)
+        state.airport = Airport.__new__(Airport)
+        state.airport.__dict__.update(payload['airport'])
+        state.history = payload['history']
+        state.inputs = payload['inputs']
+        state.saved_runs = payload.get('saved_runs', [])
+        return state
+
+    def size_bytes(self):
+        return len(pickle.dumps(self.to_payload(), protocol=pickle.HIGHEST_PROTOCOL))
+
+class SessionStore:
+    """Process-wide registry of SimulationState objects with a global memory cap.
+
+    Sessions are measured by their pickled size, which is far smaller than the
+    memory they occupy in the process. When that total exceeds the cap, the least recently used sessions
+    that have been idle for at least ``idle_seconds`` are spilled to disk and
+    reloaded the next time their owner interacts with the app. A session stays
+    pinned in memory while the script run that checked it out is still going,
+    so the object that run is mutating is never the one written to disk.
+
+    Sessions that ``is_live`` no longer recognises and that have not been seen
+    for ``ttl_seconds`` are deleted, in memory and on disk; the spill directory
+    itself is removed when the store is garbage collected or the process exits.
+    The limits can be changed on a live store with ``configure``.
+    """
+
+    def __init__(self, memory_cap_bytes=512 * 1024 * 1024, idle_seconds=300, spill_dir=None, ttl_seconds=1800,
+                 is_live=None):
+        self.memory_cap_bytes = memory_cap_bytes
+        self.idle_seconds = idle_seconds
+        self.ttl_seconds = ttl_seconds
+        self.is_live = is_live or (lambda session_id: False)
+        self.spill_dir = pathlib.Path(tempfile.mkdtemp(prefix="airport-sim-sessions-", dir=spill_dir))
+        self._cleanup = weakref.finalize(self, shutil.rmtree, str(self.spill_dir), ignore_errors=True)
+        self._lock = threading.Lock()
+        self._states = OrderedDict()  # least recently used first
+        self._sizes = {}
+        self._last_seen = {}
+        self._pinned = {}  # session_id -> script thread that checked it out
+        self._next_purge = 0.0
+
+    def configure(self, memory_cap_bytes, idle_seconds, ttl_seconds):
+        """Apply new limits without dropping any session; a lower cap spills straight away."""
+        with self._lock:
+            self.memory_cap_bytes = memory_cap_bytes
+            self.idle_seconds = idle_seconds
+            self.ttl_seconds = ttl_seconds
+            self._next_purge = min(self._next_purge, time.monotonic() + min(60.0, ttl_seconds))
+            self._enforce_cap()
+
+    def _spill_path(self, session_id):
+        return self.spill_dir / f"{session_id}.pkl"
+
+    def checkout(self, session_id):
+        """Return the state for ``session_id``, reloading or creating it as needed."""
+        with self._lock:
+            self._purge_abandoned()
+            state = self._states.get(session_id)
+            if state is None:
+                path = self._spill_path(session_id)
+                if path.exists():
+                    with path.open("rb") as f:
+                        state = SimulationState.from_payload(pickle.load(f))
+                    path.unlink()
+                else:
+                    state = SimulationState()
+                self._states[session_id] = state
+                self._sizes[session_id] = state.size_bytes()
+            self._states.move_to_end(session_id)
+            self._last_seen[session_id] = time.monotonic()
+            # Streamlit runs each rerun on a script thread that exits once the
+            # run (and any queued reruns) finish, which releases the pin.
+            self._pinned[session_id] = threading.current_thread()
+            self._enforce_cap()
+            return state
+
+    def commit(self, session_id):
+        """Re-measure a session after it changed and spill others if over the cap."""
+        with self._lock:
+            state = self._states.get(session_id)
+            if state is None:
+                return
+            self._sizes[session_id] = state.size_bytes()
+            self._last_seen[session_id] = time.monotonic()
+            self._enforce_cap()
+
+    def iter_runs(self):
+        """Yield every session's runs, labelled by session, reading spilled sessions one at a time."""
+        with self._lock:
+            session_ids = list(self._states)
+            session_ids += [path.stem for path in self.spill_dir.glob("*.pkl") if path.stem not in self._states]
+        for session_id in session_ids:
+            state = self._states.get(session_id)
+            if state is None:
+                try:
+                    with self._spill_path(session_id).open("rb") as f:
+                        state = SimulationState.from_payload(pickle.load(f))
+                except FileNotFoundError:
+                    # Reloaded by its owner since the listing above.
+                    state = self._states.get(session_id)
+                    if state is None:
+                        continue
+            for label, strategy, rows in state.runs():
+                yield f"{session_id[:8]} {label}", strategy, rows
+
+    def stats(self):
+        with self._lock:
+            return {
+                'sessions_in_memory': len(self._states),
+                'sessions_spilled': sum(1 for _ in self.spill_dir.glob("*.pkl")),
+                'memory_bytes': sum(self._sizes.values()),
+                'memory_cap_bytes': self.memory_cap_bytes,
+            }
+
+    def _purge_abandoned(self):
+        now = time.monotonic()
+        if now < self._next_purge:
+            return
+        self._next_purge = now + min(60.0, self.ttl_seconds)
+        cutoff = now - self.ttl_seconds
+        for session_id, last_seen in list(self._last_seen.items()):
+            if last_seen > cutoff or self._is_pinned(session_id) or self.is_live(session_id):
+                continue
+            del self._last_seen[session_id]
+            self._states.pop(session_id, None)
+            self._sizes.pop(session_id, None)
+            self._spill_path(session_id).unlink(missing_ok=True)
+
+    def _is_pinned(self, session_id):
+        thread = self._pinned.get(session_id)
+        if thread is not None and not thread.is_alive():
+            del self._pinned[session_id]
+            thread = None
+        return thread is not None
+
+    def _enforce_cap(self):
+        total = sum(self._sizes.values())
+        if total <= self.memory_cap_bytes:
+            return
+        cutoff = time.monotonic() - self.idle_seconds
+        for session_id in list(self._states):
+            if total <= self.memory_cap_bytes:
+                return
+            if self._last_seen[session_id] > cutoff or self._is_pinned(session_id):
+                continue
+            total -= self._spill(session_id)
+        if total <= self.memory_cap_bytes:
+            return
+        logger.warning(
+            "Pickled session state %.1f MB is over the %.1f MB cap with no idle sessions left to spill",
+            total / 1e6, self.memory_cap_bytes / 1e6
+        )
+
+    def _spill(self, session_id):
+        state = self._states.pop(session_id)
+        with self._spill_path(session_id).open("wb") as f:
+            pickle.dump(state.to_payload(), f, protocol=pickle.HIGHEST_PROTOCOL)
+        return self._sizes.pop(session_id)
+
+def streamlit_session_is_active(session_id):
+    """True while the Streamlit server still has a browser connected to ``session_id``."""
+    return runtime.exists() and runtime.get_instance().is_active_session(session_id)
+
+@st.cache_resource
+def get_session_store(_spill_dir):
+    """One store per process; _spill_dir is read once (not hashed), limits are applied via configure()."""
+    return SessionStore(spill_dir=_spill_dir or None, is_live=streamlit_session_is_active)
+
+def downsample_positions(length, max_points):
+    """Evenly spaced row positions (always keeping the first and last) for at most max_points rows."""
+    if length <= max_points:
+        return list(range(length))
+    step = (length - 1) / (max_points - 1)
+    return sorted({round(i * step) for i in range(max_points)})
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def comparison_frame(runs, max_points):
+    """Long-format (Run, Strategy, Year, Metric, Value) data for the given saved runs.
+
+    Built once per set of runs and downsampled per series, so the chart payload
+    stays small no matter how many runs or years are compared.
+    """
+    import pandas as pd
+
+    frames = []
+    for label, strategy, rows in runs:
+        run_df = pd.DataFrame(rows, columns=HISTORY_COLUMNS)[['Year', *COMPARISON_METRICS]]
+        run_df = run_df.iloc[downsample_positions(len(run_df), max_points)]
+        run_df = run_df.melt('Year', var_name='Metric', value_name='Value')
+        run_df.insert(0, 'Strategy', strategy)
+        run_df.insert(0, 'Run', label)
+        frames.append(run_df)
+    if not frames:
+        return pd.DataFrame(columns=['Run', 'Strategy', 'Year', 'Metric', 'Value'])
+    return pd.concat(frames, ignore_index=True)
+
+def display_run_comparison(saved_runs, max_points=40):
+    import altair as alt
+
+    st.header("Compare Saved Runs")
+    labels = [label for label, _, _ in saved_runs]
+    selected = st.multiselect("Runs to compare:", labels, default=labels)
+    runs = tuple(run for run in saved_runs if run[0] in selected)
+    if not runs:
+        st.info("Select at least one saved run to compare.")
+        return
+
+    comparison_df = comparison_frame(runs, max_points)
+    chart = alt.Chart(comparison_df).mark_line(point=True).encode(
+        x=alt.X('Year:O', axis=alt.Axis(title='Year')),
+        y=alt.Y('Value:Q', axis=alt.Axis(title=None)),
+        color=alt.Color('Run:N'),
+        tooltip=['Run', 'Strategy', 'Year', 'Metric', alt.Tooltip('Value:Q', format=',.2f')]
+    ).properties(
+        height=180
+    ).facet(
+        row=alt.Row('Metric:N', sort=list(COMPARISON_METRICS), title=None)
+    ).resolve_scale(
+        y='independent'
+    )
+    st.altair_chart(chart, use_container_width=True)
+
+EXPORT_FORMATS = {
+    'CSV': ('csv', 'text/csv'),
+    'JSON Lines': ('jsonl', 'application/x-ndjson'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+}
+EXPORT_COLUMNS = ('Run', 'Strategy', *HISTORY_COLUMNS)
+EXPORT_TEXT_COLUMNS = {'Run', 'Strategy', 'CAPEX Project', 'Marketing Campaigns'}
+EXPORT_INT_COLUMNS = {'Year', 'Lead Time', 'Project Available in Year', 'Active Loans'}
+EXPORT_CHUNK_ROWS = 5000  # rows per Parquet row group
+
+def iter_export_batches(runs, chunk_rows):
+    batch = []
+    for label, strategy, rows in runs:
+        for row in rows:
+            batch.append((label, strategy, *row))
+            if len(batch) >= chunk_rows:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+def encode_export(runs, export_format, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Encode runs as CSV, JSON Lines or Parquet into a single buffer and return its bytes.
+
+    Rows are streamed straight into the buffer; Parquet is written one row
+    group of chunk_rows rows at a time so no Arrow table holds the whole export.
+    """
+    buffer = io.BytesIO()
+    if export_format in ('CSV', 'JSON Lines'):
+        text = io.TextIOWrapper(buffer, encoding='utf-8', newline='')
+        rows = ((label, strategy, *row) for label, strategy, history in runs for row in history)
+        if export_format == 'CSV':
+            writer = csv.writer(text)
+            writer.writerow(EXPORT_COLUMNS)
+            writer.writerows(rows)
+        else:
+            for row in rows:
+                text.write(json.dumps(dict(zip(EXPORT_COLUMNS, row))) + "\n")
+        text.flush()
+        text.detach()
+    elif export_format == 'Parquet':
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema([
+            (column, pa.string() if column in EXPORT_TEXT_COLUMNS
+             else pa.int64() if column in EXPORT_INT_COLUMNS else pa.float64())
+            for column in EXPORT_COLUMNS
+        ])
+        with pq.ParquetWriter(buffer, schema) as writer:
+            for batch in iter_export_batches(runs, chunk_rows):
+                writer.write_table(pa.Table.from_arrays(
+                    [pa.array(values, type=field.type) for values, field in zip(zip(*batch), schema)],
+                    schema=schema
+                ))
+    else:
+        raise ValueError(f"Unknown export format: {export_format}")
+    return buffer.getvalue()
+
+def display_export(title, runs_factory, file_stem, key):
+    """Download button whose file is generated only when clicked.
+
+    Streamlit keeps the callable's result as one bytes object in its media
+    storage until it is downloaded, so the export is encoded into one buffer.
+    """
+    st.subheader(title)
+    export_format = st.selectbox("Export format:", list(EXPORT_FORMATS), key=f"{key}_format")
+    extension, mime = EXPORT_FORMATS[export_format]
+    st.download_button(
+        f"Download {export_format}",
+        data=lambda: encode_export(runs_factory(), export_format),
+        file_name=f"{file_stem}.{extension}",
+        mime=mime,
+        key=f"{key}_download"
+    )
+
+class LoginThrottle:
+    """Runs bcrypt password checks on a bounded worker pool behind a FIFO admission queue.
+
+    Keeps cost-12 hashing off the script threads so a whole class logging in at
+    once uses at most ``workers`` cores, and turns away logins beyond ``max_queue``.
+    """
+
+    def __init__(self, workers, max_queue):
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="login-bcrypt")
+        self._lock = threading.Lock()
+        self._queued = deque()  # tickets admitted but not yet picked up by a worker
+        self._fingerprint_key = secrets.token_bytes(32)
+
+    def submit(self, password, hashed_password):
+        """Queue a check and return (ticket, future), or None when the queue is full."""
+        with self._lock:
+            if len(self._queued) >= self.max_queue:
+                return None
+            ticket = object()
+            self._queued.append(ticket)
+            future = self._pool.submit(self._check, ticket, password, hashed_password)
+        return ticket, future
+
+    def position(self, ticket):
+        """Number of logins queued ahead of ``ticket`` (0 once it is being checked)."""
+        with self._lock:
+            try:
+                return self._queued.index(ticket)
+            except ValueError:
+                return 0
+
+    def fingerprint(self, username, password, hashed_password):
+        """Keyed digest used to recognise credentials a session has already verified."""
+        message = "\0".join((username, password, hashed_password)).encode()
+        return hmac.new(self._fingerprint_key, message, "sha256").hexdigest()
+
+    def _check(self, ticket, password, hashed_password):
+        import bcrypt
+
+        with self._lock:
+            self._queued.remove(ticket)
+        try:
+            return bcrypt.checkpw(password.encode(), hashed_password.encode())
+        except ValueError:
+            # Malformed hash in config.yaml
+            return False
+
+@st.cache_resource
+def get_login_throttle(workers, max_queue):
+    return LoginThrottle(workers, max_queue)
+
+def throttled_login(authenticator, credentials, throttle):
+    """Login form whose password check waits its turn on the LoginThrottle.
+
+    Returns (name, authentication_status, username) like the authenticator does.
+    """
+    login_slot = st.empty()
+    with login_slot.container():
+        with st.form(key="Login"):
+            st.subheader("Login")
+            username = st.text_input("Username", autocomplete="off")
+            password = st.text_input("Password", type="password", autocomplete="off")
+            submitted = st.form_submit_button("Login")
+
+    if not (submitted and username):
+        return None, st.session_state.get("authentication_status"), None
+
+    user = credentials["usernames"].get(username)
+    verified = False
+    if user is not None:
+        fingerprint = throttle.fingerprint(username, password, user["password"])
+        verified_logins = st.session_state.setdefault("verified_logins", {})
+        if verified_logins.get(username) == fingerprint:
+            verified = True
+        else:
+            status = st.empty()
+
+            def wait_for_check(ticket, future):
+                while not wait([future], timeout=0.5).done:
+                    ahead = throttle.position(ticket)
+                    status.info(f"Checking your login... {ahead} ahead of you in the queue." if ahead
+                                else "Checking your login...")
+                status.empty()
+                return future.result()
+
+            # At most one queued check per session: a repeated Login click picks
+            # up the check already in flight (a rerun abandons the wait, not the
+            # check), and new credentials wait for the earlier check to finish.
+            pending = st.session_state.get("pending_login")
+            if pending is not None and pending[0] != fingerprint:
+                wait_for_check(*pending[1:])
+                pending = None
+            if pending is None:
+                admitted = throttle.submit(password, user["password"])
+                if admitted is None:
+                    st.warning("Many people are logging in right now. Please try again in a few seconds.")
+                    return None, None, None
+                pending = (fingerprint, *admitted)
+                st.session_state["pending_login"] = pending
+            verified = wait_for_check(*pending[1:])
+            st.session_state.pop("pending_login", None)
+            if verified:
+                verified_logins[username] = fingerprint
+
+    if not verified:
+        st.session_state["authentication_status"] = False
+        return None, False, username
+
+    # Same session keys the authenticator sets after its own credential check
+    st.session_state["email"] = user.get("email")
+    st.session_state["name"] = user.get("name", username)
+    st.session_state["roles"] = user.get("roles")
+    st.session_state["authentication_status"] = True
+    st.session_state["username"] = username
+    login_slot.empty()
+    if hasattr(authenticator, "cookie_controller"):
+        # Renders the cookie component; like the authenticator's own login, the
+        # run carries on instead of rerunning so the browser gets to store it.
+        authenticator.cookie_controller.set_cookie()
+    return st.session_state["name"], True, username
+
 # -----------------------------
 # Main Streamlit application
 # -----------------------------
@@ -447,15 +1126,26 @@ if not hasattr(stauth, "Authenticate"):
     st.stop()
 
 # 1) Load config.yaml from either the script directory or current working dir
-config = None
-for candidate in [
-    pathlib.Path(__file__).with_name("config.yaml"),
-    pathlib.Path("config.yaml")
-]:
-    if candidate.exists():
-        with candidate.open("r", encoding="utf-8") as f:
-            config = yaml.load(f, Loader=SafeLoader)
-        break
+def find_config_path():
+    for candidate in [
+        pathlib.Path(__file__).with_name("config.yaml"),
+        pathlib.Path("config.yaml")
+    ]:
+        if candidate.exists():
+            return candidate
+    return None
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def load_config(path, mtime):
+    """Parse config.yaml once per file version; editing the file (new mtime) re-reads it."""
+    import yaml
+    from yaml.loader import SafeLoader
+
+    with open(path, "r", encoding="utf-8") as f:
+        return yaml.load(f, Loader=SafeLoader)
+
+config_path = find_config_path()
+config = load_config(str(config_path.resolve()), config_path.stat().st_mtime) if config_path else None
 
 if not config:
     st.error("Error: 'config.yaml' file not found next to the app or in the working directory.")
@@ -485,20 +1175,35 @@ authenticator = stauth.Authenticate(
     config["cookie"]["expiry_days"]
 )
 
+startup_seconds = time.perf_counter() - _script_started
+if startup_seconds > STARTUP_BUDGET_SECONDS:
+    logger.warning("Startup took %.2fs (budget %.2fs)", startup_seconds, STARTUP_BUDGET_SECONDS)
+
 # 4) Login – prefer NEW API first, fallback to OLD tuple API
 name = username = authentication_status = None
+login_settings = config.get("login") or {}
+login_throttle = get_login_throttle(
+    int(login_settings.get("workers", max(1, (os.cpu_count() or 2) // 2))),
+    int(login_settings.get("max_queue", 300))
+)
 
+legacy_login = False
 try:
-    # NEW API (>= 0.4.x): pass only location; results stored in st.session_state
-    authenticator.login(location='main')  # use 'sidebar' if you want it in the sidebar
+    # NEW API (>= 0.4.x): 'unrendered' only restores a session from the auth cookie,
+    # which needs no bcrypt check; passwords go through the throttled form below.
+    authenticator.login(location='unrendered')
     name = st.session_state.get("name")
     authentication_status = st.session_state.get("authentication_status")
     username = st.session_state.get("username")
 
 except TypeError:
     # OLD API (< 0.4): returns (name, authentication_status, username)
+    legacy_login = True
     name, authentication_status, username = authenticator.login('Login', 'main')
 
+if not authentication_status and not legacy_login:
+    name, authentication_status, username = throttled_login(authenticator, config["credentials"], login_throttle)
+
 
 # 5) Handle login states
 if authentication_status:
@@ -516,26 +1221,29 @@ else:
 # From here down: your app runs for authenticated users
 # -----------------------------
 
-if 'airport' not in st.session_state:
-    st.session_state.airport = Airport(
-        initial_traffic=10_000_000,
-        initial_equity=500_000_000,
-        initial_assets=500_000_000,
-        initial_opex_ratio=0.1,
-        initial_asset_value=1_000_000_000,
-        initial_cargo_tonnes=500_000
-    )
+export_admins = (config.get("export") or {}).get("admins") or []
+
+# 6) Per-session simulation state lives in a shared, memory-capped store
+session_settings = config.get("sessions") or {}
+session_store = get_session_store(session_settings.get("spill_dir") or None)
+session_store.configure(
+    int(float(session_settings.get("memory_cap_mb", 512)) * 1024 * 1024),
+    float(session_settings.get("idle_seconds", 300)),
+    float(session_settings.get("ttl_seconds", 1800))
+)
 
-if 'gdp_data' not in st.session_state:
-    st.session_state.gdp_data = {
-        1: 2.0, 2: 2.5, 3: 1.8, 4: 3.0, 5: 2.2,
-        6: 2.8, 7: 1.5, 8: 2.0, 9: 2.5, 10: 2.3,
-        11: 2.1, 12: 1.9, 13: 2.6, 14: 2.4, 15: 2.7,
-        16: 2.0, 17: 2.2, 18: 2.5, 19: 2.1, 20: 2.3
-    }
+if 'sim_id' not in st.session_state:
+    # Key the store by Streamlit's own session id so it can tell when Streamlit
+    # has dropped the session (refresh, closed tab) and release its state.
+    ctx = get_script_run_ctx()
+    st.session_state.sim_id = ctx.session_id if ctx else uuid.uuid4().hex
 
-if 'history' not in st.session_state:
-    st.session_state.history = []
+sim = session_store.checkout(st.session_state.sim_id)
+airport = sim.airport
+
+if username in export_admins:
+    with st.sidebar:
+        display_export("Export All Sessions", session_store.iter_runs, "airport-sim-all-sessions", "export_all")
 
 if 'simulate_clicked' not in st.session_state:
     st.session_state.simulate_clicked = False
@@ -549,39 +1257,67 @@ def advance_year():
     st.rerun()
     scroll_to_top()
 
-if st.session_state.airport.strategy is None:
+if airport.strategy is None:
     st.header("Current Airport Status (Initial Year)")
-    terminal_utilization = (st.session_state.airport.traffic / st.session_state.airport.capacity_pax) * 100
-    initial_opex_percent = (st.session_state.airport.opex / st.session_state.airport.asset_replacement_value) * 100
-    initial_runway_utilization = (st.session_state.airport.current_movements / st.session_state.airport.runway_capacity_movements) * 100
+    terminal_utilization = (airport.traffic / airport.capacity_pax) * 100
+    initial_opex_percent = (airport.opex / airport.asset_replacement_value) * 100
+    initial_runway_utilization = (airport.current_movements / airport.runway_capacity_movements) * 100
 
-    st.write(f"Current Passenger Capacity: {st.session_state.airport.capacity_pax:,.0f} passengers")
-    st.write(f"Current Number of Passengers: {st.session_state.airport.traffic:,.0f} passengers")
-    st.write(f"Current Number of Cargo Tonnes: {st.session_state.airport.cargo_tonnes:,.0f} tonnes")
+    st.write(f"Current Passenger Capacity: {airport.capacity_pax:,.0f} passengers")
+    st.write(f"Current Number of Passengers: {airport.traffic:,.0f} passengers")
+    st.write(f"Current Number of Cargo Tonnes: {airport.cargo_tonnes:,.0f} tonnes")
     st.write(f"Current Terminal Capacity Utilization: {terminal_utilization:.2f}%")
-    st.write(f"Current Runway Capacity: {st.session_state.airport.runway_capacity_movements:,.0f} movements per hour")
-    st.write(f"Current Movements per peak hour: {st.session_state.airport.current_movements:.2f}")
+    st.write(f"Current Runway Capacity: {airport.runway_capacity_movements:,.0f} movements per hour")
+    st.write(f"Current Movements per peak hour: {airport.current_movements:.2f}")
     st.write(f"Current Runway Capacity Utilization (Peak Hour): {initial_runway_utilization:.2f}%")
-    st.write(f"Current OPEX: ${st.session_state.airport.opex:,.2f}")
+    st.write(f"Current OPEX: ${airport.opex:,.2f}")
     st.write(f"Current OPEX as % of Asset Value: {initial_opex_percent:.2f}%")
-    st.write(f"Current Spend per Passenger (Non-Aero): ${st.session_state.airport.non_aero_spend_per_pax:,.2f}")
+    st.write(f"Current Spend per Passenger (Non-Aero): ${airport.non_aero_spend_per_pax:,.2f}")
 
     st.header("Year 1: Strategic Planning")
     strategy_map = {'Long Haul Hub': 'a', 'Regional Hub': 'b', 'Short Haul Spoke': 'c', 'Long Haul Spoke': 'd', 'Low-Cost Airport': 'e', 'Cargo Airport': 'f', 'Passenger and Cargo Hub': 'g'}
     strategy_choice = st.selectbox("Choose your airport's strategy:", list(strategy_map.keys()))
 
     if st.button("Start Simulation"):
-        st.session_state.airport.strategy = strategy_choice
+        airport.strategy = strategy_choice
         st.session_state.current_year = 1
         st.session_state.run_simulation_flag = True
         st.session_state.simulate_clicked = False
+        session_store.commit(st.session_state.sim_id)
         st.rerun()
+
+    if sim.saved_runs:
+        display_run_comparison(sim.saved_runs)
     scroll_to_top()
 
 elif st.session_state.current_year > 10:
     st.balloons()
     st.header("Simulation Complete!")
-    st.write("You have reached the end of the 10-year simulation. Rerun the app to start over.")
+    st.write("You have reached the end of the 10-year simulation. Save this run to compare it with other strategies.")
+
+    saved_labels = [label for label, _, _ in sim.saved_runs]
+    default_label = f"{airport.strategy} #{len(sim.saved_runs) + 1}"
+    run_label = st.text_input("Run name:", value=default_label)
+    if st.button("Save Run"):
+        if run_label in saved_labels:
+            st.error(f"A saved run is already called '{run_label}'.")
+        else:
+            sim.save_run(run_label)
+            session_store.commit(st.session_state.sim_id)
+            st.success(f"Run '{run_label}' saved.")
+
+    if st.button("Start New Run"):
+        sim.start_new_run()
+        st.session_state.current_year = 0
+        st.session_state.simulate_clicked = False
+        session_store.commit(st.session_state.sim_id)
+        st.rerun()
+
+    if sim.saved_runs:
+        display_run_comparison(sim.saved_runs)
+
+    runs = sim.runs()
+    display_export("Export Runs", lambda: runs, "airport-sim-runs", "export_runs")
     scroll_to_top()
 else:
     if st.session_state.simulate_clicked:
@@ -590,28 +1326,31 @@ else:
         st.header(f"Results for Year {st.session_state.current_year}")
         st.subheader("Input Summary")
 
-        st.write(f"**CAPEX Project:** {st.session_state.get('selected_project_display', 'None')}")
-        if st.session_state.get('selected_project_display', 'None') != 'None':
-            st.write(f"**Lead Time:** {st.session_state.get('lead_time_display', 0)} years")
-            st.write(f"**Project Available:** Year {st.session_state.get('project_availability_year_display', st.session_state.current_year)}")
-        if st.session_state.get('loan_amount_display', 0) > 0:
-            st.write(f"**Loan Amount:** ${st.session_state.get('loan_amount_display', 0):,.2f}")
-        st.write(f"**Marketing Campaigns:** {', '.join(st.session_state.get('selected_campaigns_display', ['None']))}")
-        st.write(f"**OPEX Change:** {st.session_state.get('opex_change_display', 0.0):.2f}%")
-        st.write(f"**Airport Charges Change:** {st.session_state.get('aero_charge_change_display', 0.0):.2f}%")
+        st.write(f"**CAPEX Project:** {sim.inputs.get('selected_project', 'None')}")
+        if sim.inputs.get('selected_project', 'None') != 'None':
+            st.write(f"**Lead Time:** {sim.inputs.get('lead_time', 0)} years")
+            st.write(f"**Project Available:** Year {sim.inputs.get('project_availability_year', st.session_state.current_year)}")
+        if sim.inputs.get('loan_amount', 0) > 0:
+            st.write(f"**Loan Amount:** ${sim.inputs.get('loan_amount', 0):,.2f}")
+        st.write(f"**Marketing Campaigns:** {', '.join(sim.inputs.get('selected_campaigns', ['None']))}")
+        st.write(f"**OPEX Change:** {sim.inputs.get('opex_change', 0.0):.2f}%")
+        st.write(f"**Airport Charges Change:** {sim.inputs.get('aero_charge_change', 0.0):.2f}%")
 
         st.markdown("---")
         st.subheader("Actual Economic Factors")
-        st.write(f"**Actual GDP Growth:** {st.session_state.get('gdp_growth_display', 0.0)}%")
+        st.write(f"**Actual GDP Growth:** {sim.inputs.get('gdp_growth', 0.0)}%")
         st.markdown("---")
 
-        st.session_state.airport.display_metrics()
+        airport.display_metrics()
 
         # Display Summary Tables and Graphs after every year
         st.markdown("---")
         st.header(f"Simulation Overview (Years 1 to {st.session_state.current_year})")
 
-        history_df = pd.DataFrame(st.session_state.history)
+        import altair as alt
+        import pandas as pd
+
+        history_df = pd.DataFrame(sim.history, columns=HISTORY_COLUMNS)
 
         # Separate Decision Table
         st.subheader("Summary of Decisions")
@@ -679,14 +1418,17 @@ else:
         )
         st.altair_chart(impact_chart, use_container_width=True)
 
+        current_run = [('Current run', airport.strategy, tuple(sim.history))]
+        display_export("Export This Run", lambda: current_run, f"airport-sim-year-{st.session_state.current_year}", "export_run")
+
         st.markdown("<br><br><br>", unsafe_allow_html=True)
         if st.button("Advance to Next Year"):
             advance_year()
         scroll_to_top()
     else:
-        st.session_state.airport.year = st.session_state.current_year
+        airport.year = st.session_state.current_year
         st.header(f"Decisions for Year {st.session_state.current_year}")
-        gdp_growth = st.session_state.gdp_data.get(st.session_state.current_year, 2.0)
+        gdp_growth = GDP_DATA.get(st.session_state.current_year, 2.0)
         st.write(f"Predicted GDP Growth for the year: **{gdp_growth}%**")
 
         st.subheader("CAPEX Projects")
@@ -715,7 +1457,7 @@ else:
             loan_amount = st.number_input(f"Enter the loan amount for {selected_project} (max {cost:,.0f}):", max_value=float(cost), step=10000.0)
 
         st.subheader("Marketing Campaigns")
-        st.write(f"Remaining budget: ${st.session_state.airport.marketing_budget_left:,.2f}")
+        st.write(f"Remaining budget: ${airport.marketing_budget_left:,.2f}")
 
         marketing_options = {
             'a. General Awareness (€1.8M)': 'a',
@@ -735,17 +1477,30 @@ else:
         opex_change = st.number_input("Enter OPEX change (% over previous year):", value=0.0)
         aero_charge_change = st.number_input("Enter Airport Charges change (% over previous year):", value=0.0)
 
+        if st.toggle("Show what-if projection"):
+            horizon = st.slider("Projection horizon (years):", min_value=10, max_value=30, value=10)
+            projection_years = range(st.session_state.current_year, st.session_state.current_year + horizon)
+            projection_df = project_trajectories(
+                airport, horizon,
+                gdp_growth=[GDP_DATA.get(year, 2.0) for year in projection_years],
+                opex_change=opex_change,
+                aero_charge_change=aero_charge_change
+            )
+            st.caption("Repeats this year's OPEX and charges changes every year. Pending projects and loans play out; no new ones are assumed.")
+            st.line_chart(projection_df, x='Year', y=['Traffic', 'Capacity'])
+            st.line_chart(projection_df, x='Year', y=['Profit', 'Cash Balance (End of Year)', 'Debt'])
+
         if st.button("Simulate Year"):
 
             # Store inputs in session state before simulation
-            st.session_state['selected_project_display'] = selected_project
-            st.session_state['loan_amount_display'] = loan_amount
-            st.session_state['selected_campaigns_display'] = selected_campaigns
-            st.session_state['opex_change_display'] = opex_change
-            st.session_state['aero_charge_change_display'] = aero_charge_change
-            st.session_state['gdp_growth_display'] = gdp_growth
-            st.session_state['lead_time_display'] = lead_time
-            st.session_state['project_availability_year_display'] = project_availability_year
+            sim.inputs['selected_project'] = selected_project
+            sim.inputs['loan_amount'] = loan_amount
+            sim.inputs['selected_campaigns'] = selected_campaigns
+            sim.inputs['opex_change'] = opex_change
+            sim.inputs['aero_charge_change'] = aero_charge_change
+            sim.inputs['gdp_growth'] = gdp_growth
+            sim.inputs['lead_time'] = lead_time
+            sim.inputs['project_availability_year'] = project_availability_year
 
             if selected_project != 'None':
                 project_name = selected_project
@@ -767,39 +1522,57 @@ else:
                     cost = 0
                     capacity_increase = 0
 
-                st.session_state.airport.add_capex_project(project_name, cost, capacity_increase, lead_time, loan_amount)
+                airport.add_capex_project(project_name, cost, capacity_increase, lead_time, loan_amount)
 
             for campaign_label in selected_campaigns:
                 campaign_code = marketing_options[campaign_label]
-                st.session_state.airport.apply_marketing_impact(campaign_code)
+                airport.apply_marketing_impact(campaign_code)
 
             # Update for new year
-            st.session_state.airport.update_for_new_year(gdp_growth, opex_change, aero_charge_change)
+            airport.update_for_new_year(gdp_growth, opex_change, aero_charge_change)
 
             # Store historical data
             year_data = {
                 'Year': st.session_state.current_year,
-                'CAPEX Project': st.session_state.get('selected_project_display', 'None'),
+                'CAPEX Project': sim.inputs.get('selected_project', 'None'),
                 'Lead Time': lead_time,
                 'Project Available in Year': project_availability_year,
-                'Loan Amount': st.session_state.get('loan_amount_display', 0),
-                'Marketing Campaigns': ', '.join(st.session_state.get('selected_campaigns_display', ['None'])),
-                'OPEX Change (%)': st.session_state.get('opex_change_display', 0.0),
-                'Airport Charges Change (%)': st.session_state.get('aero_charge_change_display', 0.0),
-                'Traffic': st.session_state.airport.traffic,
-                'Capacity': st.session_state.airport.capacity_pax,
-                'Terminal Utilization': (st.session_state.airport.traffic / st.session_state.airport.capacity_pax) * 100,
-                'Runway Utilization': (st.session_state.airport.current_movements / st.session_state.airport.runway_capacity_movements) * 100,
-                'Profit': st.session_state.airport.profit_after_comp,
-                'Cash Balance (End of Year)': st.session_state.airport.cash_balance,
-                'Cash Flow from Operations (CFO)': st.session_state.airport.cfo,
-                'Cash Flow from Investing (CFI)': st.session_state.airport.cfi,
-                'Cash Flow from Financing (CFF)': st.session_state.airport.cff,
-                'Quality Impact on Traffic (%)': (st.session_state.airport.quality_factor-1)*100,
-                'Aero Charges Impact on Traffic (%)': st.session_state.airport.charge_impact * 100,
-                'Cost Impact on Traffic (%)': st.session_state.airport.cost_impact * -100,
+                'Loan Amount': sim.inputs.get('loan_amount', 0),
+                'Marketing Campaigns': ', '.join(sim.inputs.get('selected_campaigns', ['None'])),
+                'OPEX Change (%)': sim.inputs.get('opex_change', 0.0),
+                'Airport Charges Change (%)': sim.inputs.get('aero_charge_change', 0.0),
+                'Traffic': airport.traffic,
+                'Capacity': airport.capacity_pax,
+                'Terminal Utilization': (airport.traffic / airport.capacity_pax) * 100,
+                'Runway Utilization': (airport.current_movements / airport.runway_capacity_movements) * 100,
+                'Profit': airport.profit_after_comp,
+                'Cash Balance (End of Year)': airport.cash_balance,
+                'Cash Flow from Operations (CFO)': airport.cfo,
+                'Cash Flow from Investing (CFI)': airport.cfi,
+                'Cash Flow from Financing (CFF)': airport.cff,
+                'Quality Impact on Traffic (%)': (airport.quality_factor-1)*100,
+                'Aero Charges Impact on Traffic (%)': airport.charge_impact * 100,
+                'Cost Impact on Traffic (%)': airport.cost_impact * -100,
+                'Cargo Tonnes': airport.cargo_tonnes,
+                'Revenue (Aero)': airport.revenue_aero,
+                'Revenue (Non-Aero)': airport.revenue_non_aero,
+                'Revenue (Cargo)': airport.revenue_cargo,
+                'OPEX': airport.opex,
+                'Depreciation': airport.depreciation,
+                'EBITDA': airport.EBITDA,
+                'EBITDAR': airport.EBITDAR,
+                'Regulated Profit': airport.regulated_profit,
+                'Unregulated Profit': airport.unregulated_profit,
+                'Profit (Pre-Compensation)': airport.profit_before_comp,
+                'Compensation': airport.compensation,
+                'Interest Paid': airport.interest_paid,
+                'Equity': airport.equity,
+                'Debt': airport.debt,
+                'Active Loans': len(airport.loans),
+                'Aeronautical Charge': airport.aeronautical_charge,
             }
-            st.session_state.history.append(year_data)
+            sim.history.append(tuple(year_data[column] for column in HISTORY_COLUMNS))
+            session_store.commit(st.session_state.sim_id)
 
             st.session_state.simulate_clicked = True
             st.rerun()
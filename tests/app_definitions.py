@@ -0,0 +1,26 @@
+"""Load selected top-level definitions from streamlit_app.py for tests.
+
+streamlit_app.py runs the whole UI when imported, so only its imports and the
+requested definitions (functions, classes and module constants) are executed.
+"""
+import ast
+import pathlib
+
+APP = pathlib.Path(__file__).resolve().parent.parent / "streamlit_app.py"
+
+
+def load_app_definitions(*names):
+    wanted = set(names)
+    tree = ast.parse(APP.read_text(encoding="utf-8"), filename=str(APP))
+    body = [
+        node for node in tree.body
+        if isinstance(node, (ast.Import, ast.ImportFrom))
+        or getattr(node, "name", None) in wanted
+        or (isinstance(node, ast.Assign) and any(getattr(t, "id", None) in wanted for t in node.targets))
+    ]
+    namespace = {"__file__": str(APP), "__name__": "streamlit_app"}
+    exec(compile(ast.Module(body=body, type_ignores=[]), str(APP), "exec"), namespace)
+    missing = wanted - namespace.keys()
+    if missing:
+        raise LookupError(f"not defined at the top level of {APP.name}: {', '.join(sorted(missing))}")
+    return namespace
@@ -0,0 +1,70 @@
+"""encode_export round-trips runs through CSV, JSON Lines and Parquet."""
+import csv
+import io
+import json
+
+import pytest
+
+from app_definitions import load_app_definitions
+
+APP = load_app_definitions("HISTORY_COLUMNS", "EXPORT_COLUMNS", "EXPORT_TEXT_COLUMNS", "EXPORT_INT_COLUMNS",
+                           "EXPORT_CHUNK_ROWS", "iter_export_batches", "encode_export")
+EXPORT_COLUMNS = APP["EXPORT_COLUMNS"]
+encode_export = APP["encode_export"]
+
+
+def history_row(year, index):
+    row = []
+    for column in APP["HISTORY_COLUMNS"]:
+        if column in APP["EXPORT_TEXT_COLUMNS"]:
+            row.append(f"{column} {index}, \"quoted\"")
+        elif column in APP["EXPORT_INT_COLUMNS"]:
+            row.append(year)
+        else:
+            row.append(index * 1.25 + 0.1)
+    return tuple(row)
+
+
+# 12,000 rows over two runs: more than two row groups of EXPORT_CHUNK_ROWS
+RUNS = [
+    (f"run {run}", strategy, tuple(history_row(year % 10 + 1, run * 6000 + year) for year in range(6000)))
+    for run, strategy in enumerate(['Regional Hub', 'Cargo Airport'])
+]
+EXPECTED = [(label, strategy, *row) for label, strategy, rows in RUNS for row in rows]
+
+
+def typed(values):
+    return tuple(
+        value if column in APP["EXPORT_TEXT_COLUMNS"]
+        else int(value) if column in APP["EXPORT_INT_COLUMNS"] else float(value)
+        for column, value in zip(EXPORT_COLUMNS, values)
+    )
+
+
+def test_csv_round_trip():
+    reader = csv.reader(io.StringIO(encode_export(RUNS, 'CSV').decode("utf-8"), newline=""))
+    assert tuple(next(reader)) == EXPORT_COLUMNS
+    assert [typed(row) for row in reader] == EXPECTED
+
+
+def test_json_lines_round_trip():
+    records = [json.loads(line) for line in encode_export(RUNS, 'JSON Lines').decode("utf-8").splitlines()]
+    assert [tuple(record[column] for column in EXPORT_COLUMNS) for record in records] == EXPECTED
+
+
+def test_parquet_round_trip():
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    parquet_file = pq.ParquetFile(io.BytesIO(encode_export(RUNS, 'Parquet')))
+    assert parquet_file.num_row_groups == -(-len(EXPECTED) // APP["EXPORT_CHUNK_ROWS"])
+    table = parquet_file.read()
+    assert tuple(table.column_names) == EXPORT_COLUMNS
+    assert list(zip(*(table.column(column).to_pylist() for column in EXPORT_COLUMNS))) == EXPECTED
+
+
+def test_empty_and_unknown_formats():
+    assert encode_export([], 'CSV').decode("utf-8").splitlines() == [",".join(
+        f'"{column}"' if "," in column else column for column in EXPORT_COLUMNS)]
+    assert encode_export([], 'JSON Lines') == b""
+    with pytest.raises(ValueError):
+        encode_export(RUNS, 'Excel')
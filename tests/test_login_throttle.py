@@ -0,0 +1,59 @@
+"""LoginThrottle queues bcrypt checks in order, turns away logins beyond max_queue and survives bad hashes."""
+import threading
+
+import pytest
+
+from app_definitions import load_app_definitions
+
+bcrypt = pytest.importorskip("bcrypt")
+LoginThrottle = load_app_definitions("LoginThrottle")["LoginThrottle"]
+
+HASHED = bcrypt.hashpw(b"secret", bcrypt.gensalt(rounds=4)).decode()
+
+
+@pytest.fixture
+def blocked_throttle():
+    """A one-worker throttle whose worker is busy until the test releases it."""
+    throttle = LoginThrottle(workers=1, max_queue=3)
+    release = threading.Event()
+    throttle._pool.submit(release.wait)
+    yield throttle, release
+    release.set()
+    throttle._pool.shutdown(wait=True)
+
+
+def test_position_is_fifo(blocked_throttle):
+    throttle, release = blocked_throttle
+    admitted = [throttle.submit("secret", HASHED) for _ in range(3)]
+    assert [throttle.position(ticket) for ticket, _ in admitted] == [0, 1, 2]
+
+    release.set()
+    assert all(future.result(timeout=10) for _, future in admitted)
+    assert [throttle.position(ticket) for ticket, _ in admitted] == [0, 0, 0]
+
+
+def test_full_queue_turns_logins_away(blocked_throttle):
+    throttle, release = blocked_throttle
+    admitted = [throttle.submit("secret", HASHED) for _ in range(3)]
+    assert throttle.submit("secret", HASHED) is None
+
+    release.set()
+    for _, future in admitted:
+        future.result(timeout=10)
+    assert throttle.submit("secret", HASHED) is not None
+
+
+def test_checks_password_and_rejects_malformed_hash():
+    throttle = LoginThrottle(workers=2, max_queue=10)
+    assert throttle.submit("secret", HASHED)[1].result(timeout=10) is True
+    assert throttle.submit("wrong", HASHED)[1].result(timeout=10) is False
+    assert throttle.submit("secret", "not-a-bcrypt-hash")[1].result(timeout=10) is False
+
+
+def test_fingerprint_depends_on_every_credential():
+    throttle = LoginThrottle(workers=1, max_queue=1)
+    fingerprint = throttle.fingerprint("participant", "secret", HASHED)
+    assert fingerprint == throttle.fingerprint("participant", "secret", HASHED)
+    assert fingerprint != throttle.fingerprint("participant", "wrong", HASHED)
+    assert fingerprint != throttle.fingerprint("other", "secret", HASHED)
+    assert fingerprint != LoginThrottle(workers=1, max_queue=1).fingerprint("participant", "secret", HASHED)
@@ -0,0 +1,86 @@
+"""project_trajectories must reproduce stepping Airport.update_for_new_year year by year."""
+import copy
+
+import numpy as np
+import pytest
+
+from app_definitions import load_app_definitions
+
+MODEL = load_app_definitions("STRATEGY_PARAMS", "Airport", "project_trajectories")
+Airport = MODEL["Airport"]
+project_trajectories = MODEL["project_trajectories"]
+
+STRATEGIES = list(MODEL["STRATEGY_PARAMS"])
+COLUMNS = ['Traffic', 'Cargo Tonnes', 'Capacity', 'OPEX', 'Debt', 'Interest Paid', 'Compensation',
+           'Profit', 'Equity', 'Cash Balance (End of Year)']
+
+
+def new_airport(strategy, traffic=10_000_000):
+    airport = Airport(
+        initial_traffic=traffic,
+        initial_equity=500_000_000,
+        initial_assets=500_000_000,
+        initial_opex_ratio=0.1,
+        initial_asset_value=1_000_000_000,
+        initial_cargo_tonnes=500_000
+    )
+    airport.strategy = strategy
+    airport.year = 1
+    return airport
+
+
+def stepped(airport, years, gdp_growth, opex_change, aero_charge_change):
+    rows = []
+    for t in range(years):
+        airport.update_for_new_year(
+            *(np.broadcast_to(value, (years,))[t] for value in (gdp_growth, opex_change, aero_charge_change))
+        )
+        rows.append((airport.traffic, airport.cargo_tonnes, airport.capacity_pax, airport.opex, airport.debt,
+                     airport.interest_paid, airport.compensation, airport.profit_after_comp, airport.equity,
+                     airport.cash_balance))
+    return np.array(rows)
+
+
+SCENARIOS = {
+    # name: (starting traffic, gdp, opex change, charge change)
+    'steady': (10_000_000, 2.0, 0.0, 0.0),
+    'hits capacity ceiling': (10_000_000, 2.0, 6.0, -10.0),
+    'cost cutting': (10_000_000, 2.0, -8.0, 4.0),
+    'schedule': (10_000_000, np.linspace(1, 4, 30), np.sin(np.arange(30)) * 5, np.cos(np.arange(30)) * 5),
+    'congested from year 1': (20_000_000, 2.0, 0.0, 0.0),
+    'congested, charges cut': (20_000_000, 2.0, 0.0, -5.0),
+}
+
+
+@pytest.mark.parametrize("years", [10, 20, 30])
+@pytest.mark.parametrize("scenario", list(SCENARIOS))
+@pytest.mark.parametrize("strategy", STRATEGIES)
+def test_projection_matches_stepping(strategy, scenario, years):
+    traffic, gdp, opex_change, charge_change = SCENARIOS[scenario]
+    gdp, opex_change, charge_change = (value if np.ndim(value) == 0 else value[:years]
+                                       for value in (gdp, opex_change, charge_change))
+    airport = new_airport(strategy, traffic)
+
+    expected = stepped(copy.deepcopy(airport), years, gdp, opex_change, charge_change)
+    projected = project_trajectories(airport, years, gdp, opex_change, charge_change)[COLUMNS].to_numpy()
+
+    np.testing.assert_allclose(projected, expected, rtol=1e-8, atol=1.0)
+
+
+def test_projection_with_pending_projects_and_loans():
+    airport = new_airport('Passenger and Cargo Hub')
+    airport.add_capex_project('New Terminal', 150e6, 2e6, 3, 1e8)
+    airport.add_capex_project('Cargo Hangar', 45e6, 200_000, 1, 0)
+    airport.update_for_new_year(2.0, 0, 0)
+    airport.add_capex_project('Non-Aero Retail Expansion', 50e6, 0, 1, 2e7)
+    airport.take_loan(3e7)
+
+    expected = stepped(copy.deepcopy(airport), 30, 2.0, 1.0, 2.0)
+    projected = project_trajectories(airport, 30, 2.0, 1.0, 2.0)[COLUMNS].to_numpy()
+
+    np.testing.assert_allclose(projected, expected, rtol=1e-8, atol=1.0)
+
+
+def test_projection_rejects_empty_horizon():
+    with pytest.raises(ValueError):
+        project_trajectories(new_airport('Regional Hub'), 0)
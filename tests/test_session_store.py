@@ -0,0 +1,120 @@
+"""SessionStore spills idle sessions, never spills a pinned one and forgets dropped ones."""
+import threading
+import time
+
+from app_definitions import load_app_definitions
+
+APP = load_app_definitions("STRATEGY_PARAMS", "Airport", "MAX_SAVED_RUNS", "logger", "SimulationState",
+                           "SessionStore")
+SessionStore = APP["SessionStore"]
+
+
+def in_script_run(function, *args):
+    """Call function on its own thread, like one Streamlit script run, and return its result."""
+    result = []
+    thread = threading.Thread(target=lambda: result.append(function(*args)))
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+def spilled(store):
+    return {path.stem for path in store.spill_dir.glob("*.pkl")}
+
+
+def play_run(store, session_id, strategy):
+    def run():
+        state = store.checkout(session_id)
+        state.airport.strategy = strategy
+        state.history.append((1, strategy))
+        state.save_run(f"{strategy} #1")
+        store.commit(session_id)
+    in_script_run(run)
+
+
+def test_idle_lru_session_spills_and_reloads_intact(tmp_path):
+    store = SessionStore(memory_cap_bytes=10 ** 9, idle_seconds=0, spill_dir=tmp_path)
+    play_run(store, "a", "Cargo Airport")
+    play_run(store, "b", "Regional Hub")
+
+    # Room for one session only: the least recently used one goes to disk
+    store.configure(store.stats()['memory_bytes'] - 1, 0, 1800)
+    assert spilled(store) == {"a"}
+    assert store.stats()['sessions_in_memory'] == 1
+
+    state = in_script_run(store.checkout, "a")
+    assert "a" not in spilled(store)
+    assert state.airport.strategy == "Cargo Airport"
+    assert state.history == [(1, "Cargo Airport")]
+    assert [label for label, _, _ in state.saved_runs] == ["Cargo Airport #1"]
+
+
+def test_session_pinned_by_running_script_is_never_spilled(tmp_path):
+    store = SessionStore(memory_cap_bytes=1, idle_seconds=0, spill_dir=tmp_path)
+    checked_out = threading.Event()
+    finish = threading.Event()
+
+    def slow_run():
+        store.checkout("a")
+        checked_out.set()
+        finish.wait()
+
+    run = threading.Thread(target=slow_run)
+    run.start()
+    checked_out.wait()
+    try:
+        in_script_run(store.checkout, "b")
+        in_script_run(store.checkout, "c")
+        assert "a" not in spilled(store)
+    finally:
+        finish.set()
+        run.join()
+
+    in_script_run(store.checkout, "d")
+    assert "a" in spilled(store)
+
+
+def test_dropped_sessions_are_purged_after_ttl(tmp_path):
+    live = {"a"}
+    store = SessionStore(memory_cap_bytes=1, idle_seconds=0, spill_dir=tmp_path, ttl_seconds=0.5,
+                         is_live=live.__contains__)
+    for session_id in "abc":
+        in_script_run(store.checkout, session_id)
+    assert spilled(store) == {"a", "b"}
+    assert store.stats()['sessions_in_memory'] == 1
+
+    store._next_purge = 0.0
+    store._purge_abandoned()
+    assert spilled(store) == {"a", "b"}
+    assert store.stats()['sessions_in_memory'] == 1
+
+    time.sleep(0.6)
+    store._next_purge = 0.0
+    store._purge_abandoned()
+    assert spilled(store) == {"a"}
+    assert store.stats()['sessions_in_memory'] == 0
+
+
+def test_iter_runs_covers_memory_and_disk(tmp_path):
+    store = SessionStore(memory_cap_bytes=10 ** 9, idle_seconds=0, spill_dir=tmp_path)
+    play_run(store, "a", "Cargo Airport")
+    play_run(store, "b", "Regional Hub")
+    store.configure(store.stats()['memory_bytes'] - 1, 0, 1800)
+    assert spilled(store) == {"a"}
+
+    runs = {(label, strategy) for label, strategy, _ in store.iter_runs()}
+    assert runs == {
+        ("a Cargo Airport #1", "Cargo Airport"), ("a Current run", "Cargo Airport"),
+        ("b Regional Hub #1", "Regional Hub"), ("b Current run", "Regional Hub"),
+    }
+
+
+def test_spill_dir_removed_with_the_store(tmp_path):
+    store = SessionStore(memory_cap_bytes=1, idle_seconds=0, spill_dir=tmp_path)
+    in_script_run(store.checkout, "a")
+    in_script_run(store.checkout, "b")
+    spill_dir = store.spill_dir
+    assert spilled(store)
+
+    del store
+    assert not spill_dir.exists()